@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -23,15 +24,40 @@ OCR_PARAREL_PREPROCESSING = True
 OCR_PARAREL_PREPROCESSING_LANG = True
 OCR_MAX_WORKERS = 4
 
+PAGE_ANALYSIS_ENABLED = True
+PAGE_ANALYSIS_MAX_SIDE = 1000
+PAGE_BLANK_INK_DELTA = 50
+PAGE_BLANK_MAX_STD = 8.0
+PAGE_BLANK_MAX_COMPONENTS = 0
+PAGE_BLANK_MIN_COMPONENT_AREA = 16
+PAGE_OSD_MIN_CONFIDENCE = 2.0
+PAGE_DESKEW_MAX_ANGLE = 5.0
+PAGE_DESKEW_STEP = 0.5
+PAGE_DESKEW_MIN_ANGLE = 0.3
+
+OCR_REGION_MODE = True
+OCR_REGION_BATCH_SIZE = 16
+OCR_REGION_MIN_CONFIDENCE = 0.3
+
 CHUNK_SIZE = 4000
 CHUNK_OVERLAP = 500
 MAX_TOKENS_PER_CHUNK = 4000
 TOKEN_ESTIMATION_RATIO = 4  # 1 token ≈ 4 characters
 
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_MAX_ENTRIES = 512
+PAGE_CACHE_DISK_ENABLED = False
+PAGE_CACHE_DISK_MAX_ENTRIES = 2048
+PAGE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ocr_page_cache")
+
 UNSTRUCTURED_TIMEOUT = 15
 UNSTRUCTURED_MODE = "single"
 UNSTRUCTURED_STRATEGY = "fast"
 
+RESPONSE_MODES = ("full", "summary")
+DEFAULT_RESPONSE_MODE = "full"
+RESPONSE_GZIP_MIN_SIZE = 1000
+
 LLM_MODEL = "llama-3.3-70b-versatile"
 LLM_MAX_TOKENS = 1000
 
@@ -1,4 +1,4 @@
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import io
 import fitz  # PyMuPDF
 from PIL import Image
@@ -9,9 +9,61 @@ from pdf_utils import (
     extract_text_from_pdf_native,
     extract_tables_from_pdf_fast
 )
-from ocr_utils import extract_from_image_easyocr
+from ocr_utils import extract_from_image_with_engine, get_ocr_engine, prepare_page_for_ocr
 from unstructured_utils import extract_with_unstructured
-from config import OCR_DPI, OCR_PARAREL_PREPROCESSING, OCR_MAX_WORKERS
+from page_cache import page_cache, bytes_key, image_pixels_key
+from config import OCR_DPI, OCR_PARAREL_PREPROCESSING, OCR_MAX_WORKERS, PAGE_CACHE_ENABLED
+
+def ocr_page_cached(
+    load_image: Callable[[], Image.Image],
+    source_bytes: Optional[bytes] = None
+) -> Tuple[Optional[str], List[str], bool]:
+
+    # Texto None indica página em branco.
+    if not PAGE_CACHE_ENABLED:
+        text, tables, _ = ocr_page(load_image())
+        return text, tables, False
+
+    # O motor disponível entra na chave: resultado só do Tesseract não é servido quando o EasyOCR volta.
+    engine = get_ocr_engine()
+    source_key = bytes_key(source_bytes, engine) if source_bytes is not None else None
+    cached = page_cache.get(source_key) if source_key else None
+    image_key = None
+
+    if cached is None:
+        image = load_image()
+        image_key = image_pixels_key(image, engine)
+        cached = page_cache.get(image_key)
+
+    if cached is not None:
+        if source_key and image_key:
+            page_cache.put(source_key, cached)
+        return cached["text"], cached["tables"], True
+
+    page_cache.record_miss()
+    text, tables, used_engine = ocr_page(image)
+
+    # Se o EasyOCR falhou nesta página, o resultado de fallback não vai para o cache.
+    if used_engine in (engine, "none"):
+        cached = {"text": text, "tables": tables}
+        page_cache.put(image_key, cached)
+        if source_key:
+            page_cache.put(source_key, cached)
+    return text, tables, False
+
+def ocr_page(image: Image.Image) -> Tuple[Optional[str], List[str], str]:
+    prepared = prepare_page_for_ocr(image)
+    if prepared is None:
+        return None, [], "none"
+    return extract_from_image_with_engine(prepared, analyze=False)
+
+def page_cache_summary(hits: int, pages: int) -> Dict:
+    return {
+        "pages": pages,
+        "hits": hits,
+        "hit_rate": round(hits / pages, 3) if pages else 0.0,
+        "global": page_cache.stats()
+    }
 
 def extract_text_and_tables(file_bytes: bytes, file_type: str = "pdf", filename: str = "tempfile") -> Dict:
 
@@ -43,26 +95,31 @@ def extract_text_and_tables(file_bytes: bytes, file_type: str = "pdf", filename:
     # ===== Metodo 2 - OCR
     tables = []
     full_text = ""
+    blank_pages = 0
+    cache_hits = 0
 
     if file_type == "pdf":
         pdf_document = fitz.open(stream=file_bytes, filetype="pdf")
         page_count = pdf_document.page_count
 
+        def process_page(page_num: int) -> Tuple[int, Optional[str], list, bool]:
+            page = pdf_document[page_num]
+
+            def render_page() -> Image.Image:
+                pix = page.get_pixmap(dpi=OCR_DPI)
+                img_data = pix.tobytes("png")
+                return Image.open(io.BytesIO(img_data))
+
+            page_text, page_tables, cache_hit = ocr_page_cached(render_page)
+            return page_num, page_text, page_tables, cache_hit
+
         # Decide on parallel processing based on page count and settings
         use_parallel = OCR_PARAREL_PREPROCESSING and page_count > 1
 
+        results = []
         if use_parallel:
             print(f" Processamento paralelo: {page_count} páginas com {OCR_MAX_WORKERS} workers")
 
-            def process_page(page_num: int) -> Tuple[int, str, list]:
-                page = pdf_document[page_num]
-                pix = page.get_pixmap(dpi=OCR_DPI)
-                img_data = pix.tobytes("png")
-                image = Image.open(io.BytesIO(img_data))
-                page_text, page_tables = extract_from_image_easyocr(image)
-                return page_num, page_text, page_tables
-
-            results = []
             with ThreadPoolExecutor(max_workers=OCR_MAX_WORKERS) as executor:
                 future_to_page = {
                     executor.submit(process_page, i): i
@@ -71,53 +128,62 @@ def extract_text_and_tables(file_bytes: bytes, file_type: str = "pdf", filename:
 
                 for future in as_completed(future_to_page):
                     try:
-                        page_num, page_text, page_tables = future.result()
-                        results.append((page_num, page_text, page_tables))
-                        print(f"   ✓ Página {page_num + 1}/{page_count} processada")
+                        results.append(future.result())
+                        print(f"   ✓ Página {results[-1][0] + 1}/{page_count} processada")
                     except Exception as e:
                         page_num = future_to_page[future]
                         print(f"   ✗ Erro na página {page_num + 1}: {e}")
-                        results.append((page_num, "", []))
+                        results.append((page_num, "", [], False))
 
             results.sort(key=lambda x: x[0])
-            for page_num, page_text, page_tables in results:
-                full_text += f"\n--- Página {page_num + 1} (OCR) ---\n{page_text}"
-                tables.extend(page_tables)
         else:
             print(f" Processamento sequencial: {page_count} página(s)")
             for page_num in range(page_count):
-                page = pdf_document[page_num]
-
-                pix = page.get_pixmap(dpi=OCR_DPI)
-                img_data = pix.tobytes("png")
-                image = Image.open(io.BytesIO(img_data))
-
-                page_text, page_tables = extract_from_image_easyocr(image)
-
-                full_text += f"\n--- Página {page_num + 1} (OCR) ---\n{page_text}"
-                tables.extend(page_tables)
+                results.append(process_page(page_num))
                 print(f" Página {page_num + 1}/{page_count} processada")
 
+        for page_num, page_text, page_tables, cache_hit in results:
+            if page_text is None:
+                blank_pages += 1
+                page_text = ""
+            cache_hits += cache_hit
+            full_text += f"\n--- Página {page_num + 1} (OCR) ---\n{page_text}"
+            tables.extend(page_tables)
+
         pdf_document.close()
+        cache_info = page_cache_summary(cache_hits, page_count)
 
         if len(full_text.strip()) > 100:
             print(f"  OCR: {len(full_text)} chars, {len(tables)} tabelas")
             return {
                 "text": full_text,
                 "tables": tables,
-                "method": "OCR (Tesseract/EasyOCR)"
+                "method": "OCR (Tesseract/EasyOCR)",
+                "page_cache": cache_info
             }
 
+        if blank_pages:
+            # Páginas em branco não impedem o fallback: se a detecção errou, o Unstructured ainda tenta.
+            print(f" {blank_pages}/{page_count} página(s) em branco")
+
     else:
-        image = Image.open(io.BytesIO(file_bytes))
-        full_text, tables = extract_from_image_easyocr(image)
+        full_text, tables, cache_hit = ocr_page_cached(
+            lambda: Image.open(io.BytesIO(file_bytes)),
+            file_bytes
+        )
+        cache_info = page_cache_summary(int(cache_hit), 1)
+
+        if full_text is None:
+            print(" Imagem em branco detectada - seguindo para o fallback")
+            full_text = ""
 
         if len(full_text.strip()) > 50:
             print(f" OCR (Imagem): {len(full_text)} chars, {len(tables)} tabelas")
             return {
                 "text": full_text,
                 "tables": tables,
-                "method": "OCR (Tesseract/EasyOCR - Imagem)"
+                "method": "OCR (Tesseract/EasyOCR - Imagem)",
+                "page_cache": cache_info
             }
 
     # ===== Metodo 3 - Unstructured (caso o OCR falhe)
@@ -0,0 +1,222 @@
+import re
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Confusões comuns do OCR em campos numéricos (letra lida no lugar do dígito).
+OCR_DIGIT_CONFUSIONS = str.maketrans({
+    'O': '0', 'o': '0', 'D': '0', 'Q': '0',
+    'I': '1', 'l': '1', '|': '1',
+    'Z': '2', 'A': '4', 'S': '5', 's': '5',
+    'G': '6', 'T': '7', 'B': '8', 'g': '9'
+})
+
+_D = r"[\dODQIlZASsGTBgo|]"
+
+CPF_PATTERN = re.compile(
+    rf"(?<![\w/]){_D}{{3}}\.?\s?{_D}{{3}}\.?\s?{_D}{{3}}\s?-?\s?{_D}{{2}}(?![\w/])"
+)
+CNPJ_PATTERN = re.compile(
+    rf"(?<![\w/]){_D}{{2}}\.?\s?{_D}{{3}}\.?\s?{_D}{{3}}\s?/?\s?{_D}{{4}}\s?-?\s?{_D}{{2}}(?![\w/])"
+)
+_DATE = rf"({_D}{{2}})[/.-]({_D}{{2}})[/.-]({_D}{{4}})"
+_AMOUNT = rf"({_D}{{1,3}}(?:\.{_D}{{3}})*,{_D}{{2}})"
+
+DATE_PATTERN = re.compile(rf"(?<![\w/.-]){_DATE}(?![\w/])")
+AMOUNT_PATTERN = re.compile(rf"(?:R\$\s*)?(?<![\w,.]){_AMOUNT}(?![\w,])")
+DUE_DATE_PATTERN = re.compile(
+    rf"\bvenc(?:imento|to)?\.?[^\d\n]{{0,30}}?(?<![\w/.-]){_DATE}(?![\w/])",
+    re.IGNORECASE
+)
+# "Subtotal" fica de fora pelo \b; "Valor total dos tributos" pelo lookahead.
+TOTAL_PATTERN = re.compile(
+    rf"\b(?:valor\s+)?total\b(?![^\d\n]{{0,30}}tribut)(\s+a\s+pagar)?[^\d\n]{{0,30}}?(?:R\$\s*)?(?<![\w,.]){_AMOUNT}(?![\w,])",
+    re.IGNORECASE
+)
+AMOUNT_FORMAT = re.compile(r"\d{1,3}(?:\.\d{3})*,\d{2}")
+
+FIELD_KEYWORDS = {
+    "cpf": ("cpf",),
+    "cnpj": ("cnpj",),
+    "due_date": ("vencimento", "vence", "venc"),
+    "total": ("total", "valor"),
+    "dates": ("data", "datas"),
+}
+
+FIELD_LABELS = {
+    "cpf": "CPF",
+    "cnpj": "CNPJ",
+    "due_date": "Data de vencimento",
+    "total": "Valor total",
+    "dates": "Datas",
+}
+
+# Palavras que não mudam o sentido de uma pergunta simples sobre um campo.
+QUESTION_STOPWORDS = {
+    "qual", "quais", "e", "o", "a", "os", "as", "do", "da", "dos", "das", "de",
+    "no", "na", "nos", "nas", "me", "diga", "informe", "mostre", "retorne",
+    "numero", "documento", "arquivo", "conta", "fatura", "boleto", "nota",
+    "presente", "presentes", "existe", "existem", "tem", "ha", "desse", "deste",
+    "dessa", "desta", "esse", "este", "essa", "esta", "aqui", "pagar", "por",
+    "favor", "que", "quando", "quanto", "quantos", "sao", "seu", "sua", "la",
+}
+
+
+def _only_digits(candidate: str) -> str:
+    # Aceita no máximo três caracteres corrigidos para não transformar palavras em números.
+    if sum(c.isalpha() or c == '|' for c in candidate) > 3:
+        return ""
+    return re.sub(r"\D", "", candidate.translate(OCR_DIGIT_CONFUSIONS))
+
+
+def _clean_amount(candidate: str) -> Optional[str]:
+    if not any(c.isdigit() for c in candidate) or sum(c.isalpha() or c == '|' for c in candidate) > 3:
+        return None
+    amount = candidate.translate(OCR_DIGIT_CONFUSIONS)
+    return f"R$ {amount}" if AMOUNT_FORMAT.fullmatch(amount) else None
+
+
+def _clean_date(day: str, month: str, year: str) -> Optional[str]:
+    digits = _only_digits(day + month + year)
+    if len(digits) != 8 or not any(c.isdigit() for c in day + month + year):
+        return None
+    return _valid_date(digits[:2], digits[2:4], digits[4:])
+
+
+def validate_cpf(digits: str) -> bool:
+
+    if len(digits) != 11 or digits == digits[0] * 11:
+        return False
+
+    for position in (9, 10):
+        total = sum(int(digits[i]) * (position + 1 - i) for i in range(position))
+        check = (total * 10) % 11 % 10
+        if check != int(digits[position]):
+            return False
+    return True
+
+
+def validate_cnpj(digits: str) -> bool:
+
+    if len(digits) != 14 or digits == digits[0] * 14:
+        return False
+
+    weights = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    for position in (12, 13):
+        w = weights[13 - position:]
+        total = sum(int(digits[i]) * w[i] for i in range(position))
+        check = 11 - total % 11
+        check = 0 if check >= 10 else check
+        if check != int(digits[position]):
+            return False
+    return True
+
+
+def format_cpf(digits: str) -> str:
+    return f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+
+
+def format_cnpj(digits: str) -> str:
+    return f"{digits[:2]}.{digits[2:5]}.{digits[5:8]}/{digits[8:12]}-{digits[12:]}"
+
+
+def _valid_date(day: str, month: str, year: str) -> Optional[str]:
+    try:
+        return datetime(int(year), int(month), int(day)).strftime("%d/%m/%Y")
+    except ValueError:
+        return None
+
+
+def _unique(values: List[str]) -> List[str]:
+    return list(dict.fromkeys(values))
+
+
+def extract_fields(text: str, tables: List[str] = None) -> Dict:
+
+    content = text + ("\n" + "\n".join(tables) if tables else "")
+
+    cnpjs = []
+    for match in CNPJ_PATTERN.finditer(content):
+        digits = _only_digits(match.group())
+        if validate_cnpj(digits):
+            cnpjs.append(format_cnpj(digits))
+
+    cpfs = []
+    for match in CPF_PATTERN.finditer(content):
+        digits = _only_digits(match.group())
+        if validate_cpf(digits):
+            cpfs.append(format_cpf(digits))
+
+    dates = []
+    for parts in DATE_PATTERN.findall(content):
+        date = _clean_date(*parts)
+        if date:
+            dates.append(date)
+
+    due_date = None
+    for match in DUE_DATE_PATTERN.finditer(content):
+        due_date = _clean_date(*match.groups())
+        if due_date:
+            break
+
+    # Prefere o "total a pagar"; sem ele, o último total do documento.
+    total = None
+    total_matches = [
+        (bool(match.group(1)), _clean_amount(match.group(2)))
+        for match in TOTAL_PATTERN.finditer(content)
+    ]
+    total_matches = [(to_pay, amount) for to_pay, amount in total_matches if amount]
+    if total_matches:
+        to_pay = [amount for is_to_pay, amount in total_matches if is_to_pay]
+        total = to_pay[-1] if to_pay else total_matches[-1][1]
+
+    amounts = [_clean_amount(value) for value in AMOUNT_PATTERN.findall(content)]
+
+    return {
+        "cpf": _unique(cpfs),
+        "cnpj": _unique(cnpjs),
+        "dates": _unique(dates),
+        "amounts": _unique(amount for amount in amounts if amount),
+        "due_date": due_date,
+        "total": total,
+    }
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def answer_from_fields(prompt: str, fields: Dict) -> Optional[str]:
+
+    words = re.findall(r"\w+", _normalize(prompt))
+    if not words or not fields:
+        return None
+
+    requested = []
+    remaining = []
+    for word in words:
+        field = next((f for f, keys in FIELD_KEYWORDS.items() if word in keys), None)
+        if field:
+            if field not in requested:
+                requested.append(field)
+        elif word not in QUESTION_STOPWORDS:
+            remaining.append(word)
+
+    # Perguntas que pedem algo além dos campos conhecidos seguem para a LLM.
+    if not requested or remaining:
+        return None
+
+    if "due_date" in requested and "dates" in requested:
+        requested.remove("dates")
+
+    answers = []
+    for field in requested:
+        value = fields.get(field)
+        if not value:
+            return None
+        if isinstance(value, list):
+            value = ", ".join(value)
+        answers.append(f"{FIELD_LABELS[field]}: {value}")
+
+    return "\n".join(answers)
@@ -1,46 +1,56 @@
 from typing import Dict, List
 from groq import Groq
 from config import GROQ_API_KEY, LLM_MODEL, LLM_MAX_TOKENS
-from text_processing import count_tokens
+from text_processing import Chunk, count_terms, count_tokens
+from field_extractor import answer_from_fields
 
 client = Groq(api_key=GROQ_API_KEY)
 
-def find_relevant_chunk(chunks: List[str], prompt: str) -> tuple:
+def find_relevant_chunk(chunks: List[Chunk], prompt: str) -> tuple:
 
     if len(chunks) <= 1:
-        return chunks[0] if chunks else "", ""
+        return chunks[0].text if chunks else "", ""
 
-    query_words = [w.lower() for w in prompt.split() if len(w) > 3]
-    scores = []
-
-    for chunk in chunks:
-        score = sum(chunk.lower().count(word) for word in query_words)
-        scores.append(score)
+    query_terms = list(count_terms(prompt))
+    scores = [chunk.score(query_terms) for chunk in chunks]
 
     best_idx = scores.index(max(scores)) if scores else 0
-    relevant_text = chunks[best_idx]
+    relevant_chunk = chunks[best_idx]
     context_note = f"\n[Documento com {len(chunks)} partes. Exibindo seção mais relevante.]"
-    
-    return relevant_text, context_note
+    if relevant_chunk.first_page == relevant_chunk.last_page and relevant_chunk.first_page:
+        context_note += f"\n[Seção da página {relevant_chunk.first_page}.]"
+    elif relevant_chunk.first_page and relevant_chunk.last_page:
+        context_note += f"\n[Seção das páginas {relevant_chunk.first_page} a {relevant_chunk.last_page}.]"
+
+    return relevant_chunk.text, context_note
 
 def build_system_message(
     relevant_text: str, 
     filename: str, 
     extraction_method: str,
     tables: List[str],
-    context_note: str = ""
+    context_note: str = "",
+    fields: Dict = None
 ) -> str:
 
     tables_str = ""
     if tables:
         tables_str = "\n\nTABELAS DETECTADAS:\n" + "\n".join(tables[:10])
+
+    fields_str = ""
+    if fields:
+        found = {name: value for name, value in fields.items() if value}
+        if found:
+            fields_str = "\n\nCAMPOS VALIDADOS:\n" + "\n".join(
+                f"{name}: {value}" for name, value in found.items()
+            )
     
     system_message = f"""Você é um assistente que responde perguntas sobre documentos.
         DOCUMENTO: {filename}{context_note}
         MÉTODO: {extraction_method}
 
         CONTEÚDO: {relevant_text}
-        {tables_str}
+        {tables_str}{fields_str}
 
         Analise o documento fornecido e responda apenas com base nas informações presentes no arquivo. Para tabelas,
         use os dados estruturados fornecidos. Caso não seja possível identificar a resposta correta, informe que não
@@ -71,6 +81,18 @@ def chat_with_llm(
         chunks_available = document_context.get('num_chunks', 1)
         extraction_method = document_context.get('extraction_method', 'N/A')
 
+        # Perguntas diretas sobre CPF, CNPJ, total ou vencimento dispensam a LLM.
+        direct_answer = answer_from_fields(prompt, document_context.get('fields'))
+        if direct_answer:
+            return {
+                "response": direct_answer,
+                "Existe contexto": has_context,
+                "Contexto": context_file,
+                "Chunks": chunks_available,
+                "Metodo de extraçao": extraction_method,
+                "Fonte": "Campos extraídos (sem LLM)"
+            }
+
         if "chunks" in document_context and len(document_context["chunks"]) > 1:
             relevant_text, context_note = find_relevant_chunk(
                 document_context["chunks"], 
@@ -88,7 +110,8 @@ def chat_with_llm(
             document_context.get('last_filename', 'Desconhecido'),
             extraction_method,
             document_context.get('tables', []),
-            context_note
+            context_note,
+            document_context.get('fields')
         )
         
         messages.append({"role": "system", "content": system_message})
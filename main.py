@@ -1,11 +1,22 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from typing import Dict, Any, Optional
 import time
 
+try:
+    # orjson serializa os textos longos da extração bem mais rápido que o json padrão.
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    DefaultResponse = JSONResponse
+
 from document_extractor import extract_text_and_tables
-from text_processing import count_tokens, split_text_into_chunks
+from text_processing import chunk_document
 from llm_utils import chat_with_llm
+from field_extractor import extract_fields
+from config import RESPONSE_MODES, DEFAULT_RESPONSE_MODE, RESPONSE_GZIP_MIN_SIZE
 
 CORS_ORIGINS = ["*"]
 CORS_CREDENTIALS = True
@@ -15,7 +26,8 @@ CORS_HEADERS = ["*"]
 app = FastAPI(
     title="Leitor de documentos e extrator de informações",
     description="Optimized document extraction and chat API",
-    version="3.0.0"
+    version="3.0.0",
+    default_response_class=DefaultResponse
 )
 
 document_context: Dict[str, Any] = {}
@@ -27,9 +39,16 @@ app.add_middleware(
     allow_methods=CORS_METHODS,
     allow_headers=CORS_HEADERS,
 )
+app.add_middleware(GZipMiddleware, minimum_size=RESPONSE_GZIP_MIN_SIZE)
 
 @app.post("/upload-documento")
-async def upload_image(file: UploadFile = File(...)) -> Dict:
+async def upload_image(file: UploadFile = File(...), response_mode: str = DEFAULT_RESPONSE_MODE) -> Dict:
+    if response_mode not in RESPONSE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"response_mode inválido. Use: {', '.join(RESPONSE_MODES)}"
+        )
+
     # Validate file type
     if not file.content_type:
         raise HTTPException(status_code=400, detail="Tipo de arquivo não identificado")
@@ -60,32 +79,46 @@ async def upload_image(file: UploadFile = File(...)) -> Dict:
         tables = result.get("tables", [])
         method = result.get("method", "Unknown")
 
-        tokens = count_tokens(text)
-        chunks = split_text_into_chunks(text) if tokens > 4000 else [text]
+        document = chunk_document(text)
+        tokens = document.token_count
+        chunks = document.chunks
+        fields = extract_fields(text, tables)
 
         document_context["last_document"] = text
         document_context["last_filename"] = file.filename
+        document_context["document"] = document
         document_context["chunks"] = chunks
         document_context["total_tokens"] = tokens
         document_context["num_chunks"] = len(chunks)
         document_context["tables"] = tables
         document_context["extraction_method"] = method
+        document_context["fields"] = fields
 
-        return {
+        response = {
             "success": True,
             "filename": file.filename,
             "file_type": file.content_type,
             "extraction_method": method,
             "text": text,
             "tables": tables,
+            "fields": fields,
             "total_tokens": tokens,
             "total_characters": len(text),
+            "pages": document.page_count,
             "chunks": len(chunks),
             "tables_count": len(tables),
+            "page_cache": result.get("page_cache"),
             "time_taken": round(elapsed_time, 2),
             "message": f"Documento processado com {method}"
         }
 
+        if response_mode == "summary":
+            # O texto fica disponível por páginas em /document-text.
+            del response["text"]
+            del response["tables"]
+
+        return response
+
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -129,6 +162,59 @@ def context_info():
         }
     return {"has_context": False, "message": "Nenhum documento carregado"}
 
+@app.get("/document-text")
+def document_text(start_page: int = 1, end_page: Optional[int] = None):
+    if "document" not in document_context:
+        return {"has_context": False, "message": "Nenhum documento carregado"}
+
+    if end_page is None:
+        end_page = start_page
+    if end_page < start_page:
+        raise HTTPException(status_code=400, detail="end_page deve ser maior ou igual a start_page")
+
+    document = document_context["document"]
+    return {
+        "has_context": True,
+        "filename": document_context.get('last_filename'),
+        "total_pages": document.page_count,
+        "pages": document.get_pages(start_page, end_page)
+    }
+
+@app.put("/document-text/{page}")
+def replace_document_page(page: int, text: str = Body(..., media_type="text/plain")):
+    if "document" not in document_context:
+        raise HTTPException(status_code=400, detail="Nenhum documento carregado")
+
+    document = document_context["document"]
+    try:
+        # Re-chunking incremental: só o grupo de páginas afetado é refeito.
+        document.replace_page(page, text)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    document_context["last_document"] = document.text
+    document_context["chunks"] = document.chunks
+    document_context["total_tokens"] = document.token_count
+    document_context["num_chunks"] = len(document.chunks)
+    document_context["fields"] = extract_fields(document.text, document_context.get("tables", []))
+
+    return {
+        "success": True,
+        "page": page,
+        "total_tokens": document.token_count,
+        "chunks": len(document.chunks)
+    }
+
+@app.get("/extracted-fields")
+def extracted_fields():
+    if "fields" in document_context:
+        return {
+            "has_context": True,
+            "filename": document_context.get('last_filename'),
+            "fields": document_context['fields']
+        }
+    return {"has_context": False, "message": "Nenhum documento carregado"}
+
 @app.get("/")
 def root():
     return {
@@ -136,10 +222,13 @@ def root():
         "version": "3.0.0",
         "description": "Extract raw text from PDFs and images",
         "endpoints": {
-            "/upload-documento": "POST - Upload and extract text",
+            "/upload-documento": "POST - Upload and extract text (response_mode: full | summary)",
+            "/document-text": "GET - Extracted text by page range",
+            "/document-text/{page}": "PUT - Replace the text of one page (plain text body)",
             "/chat": "POST - Chat with extracted context",
             "/clear-context": "POST - Clear document context",
             "/context-info": "GET - Info about current context",
+            "/extracted-fields": "GET - CPF, CNPJ, dates and amounts found in the document",
             "/docs": "GET - API documentation"
         },
         "supported_formats": ["PDF", "JPEG", "JPG", "PNG"]
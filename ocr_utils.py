@@ -13,7 +13,20 @@ from config import (
     EASYOCR_GPU, 
     TESSERACT_DEFAULT_LANG, 
     TESSERACT_FALLBACK_LANG,
-    TABLE_COLUMN_VARIATION_TOLERANCE
+    TABLE_COLUMN_VARIATION_TOLERANCE,
+    PAGE_ANALYSIS_ENABLED,
+    PAGE_ANALYSIS_MAX_SIDE,
+    PAGE_BLANK_INK_DELTA,
+    PAGE_BLANK_MAX_STD,
+    PAGE_BLANK_MAX_COMPONENTS,
+    PAGE_BLANK_MIN_COMPONENT_AREA,
+    PAGE_OSD_MIN_CONFIDENCE,
+    PAGE_DESKEW_MAX_ANGLE,
+    PAGE_DESKEW_STEP,
+    PAGE_DESKEW_MIN_ANGLE,
+    OCR_REGION_MODE,
+    OCR_REGION_BATCH_SIZE,
+    OCR_REGION_MIN_CONFIDENCE
 )
 
 _easyocr_reader = None
@@ -77,6 +90,119 @@ def preprocess_image_for_ocr(image: Image.Image) -> Image.Image:
     return Image.fromarray(denoised)
 
 
+def _downscale_gray(image: Image.Image) -> np.ndarray:
+    # Cópia reduzida em tons de cinza usada apenas para a análise da página.
+    small = image.convert("L")
+    small.thumbnail((PAGE_ANALYSIS_MAX_SIDE, PAGE_ANALYSIS_MAX_SIDE))
+    return np.array(small)
+
+
+def _ink_mask(gray: np.ndarray) -> np.ndarray:
+    # Otsu separa texto e fundo pelo contraste local; a tinta é a classe minoritária,
+    # o que funciona tanto para papel claro quanto para fundos escuros (foto na mesa, modo escuro).
+    _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    ink = binary.astype(bool)
+    return ink if ink.mean() <= 0.5 else ~ink
+
+
+def is_blank_page(image: Image.Image, gray: np.ndarray) -> bool:
+
+    # Qualquer variação relevante na miniatura (texto, bordas, foto sobre a mesa) não é página em branco.
+    if gray.size and float(gray.std()) > PAGE_BLANK_MAX_STD:
+        return False
+
+    # Página quase uniforme: confirma na resolução original, onde um número de página
+    # ou uma data isolada ainda formam componentes visíveis.
+    full = np.asarray(image.convert("L"), dtype=np.int16)
+    if not full.size:
+        return True
+    ink = np.abs(full - int(np.median(full))) > PAGE_BLANK_INK_DELTA
+    if not ink.any():
+        return True
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink.astype(np.uint8), connectivity=8)
+    components = int((stats[1:, cv2.CC_STAT_AREA] >= PAGE_BLANK_MIN_COMPONENT_AREA).sum())
+    return components <= PAGE_BLANK_MAX_COMPONENTS
+
+
+def detect_orientation(gray: np.ndarray) -> int:
+
+    try:
+        osd = pytesseract.image_to_osd(
+            Image.fromarray(gray),
+            config='--psm 0 -c min_characters_to_try=5',
+            output_type=pytesseract.Output.DICT
+        )
+    except Exception:
+        # OSD falha em páginas com pouco texto; nesse caso mantemos a orientação.
+        return 0
+
+    rotate = int(osd.get("rotate", 0)) % 360
+    if rotate and float(osd.get("orientation_conf", 0)) >= PAGE_OSD_MIN_CONFIDENCE:
+        return rotate
+    return 0
+
+
+def estimate_skew_angle(gray: np.ndarray) -> float:
+
+    ink = _ink_mask(gray).astype(np.uint8) * 255
+    height, width = ink.shape
+    center = (width / 2, height / 2)
+
+    best_angle = 0.0
+    best_score = -1.0
+    for angle in np.arange(-PAGE_DESKEW_MAX_ANGLE, PAGE_DESKEW_MAX_ANGLE + PAGE_DESKEW_STEP, PAGE_DESKEW_STEP):
+        matrix = cv2.getRotationMatrix2D(center, float(angle), 1.0)
+        rotated = cv2.warpAffine(ink, matrix, (width, height), flags=cv2.INTER_NEAREST)
+        # Linhas de texto alinhadas geram um perfil horizontal com picos bem definidos.
+        score = float(np.var(rotated.sum(axis=1, dtype=np.float64)))
+        if score > best_score:
+            best_score = score
+            best_angle = float(angle)
+
+    return best_angle
+
+
+def prepare_page_for_ocr(image: Image.Image) -> Optional[Image.Image]:
+
+    if not PAGE_ANALYSIS_ENABLED:
+        return image
+
+    try:
+        return _analyze_and_correct_page(image)
+    except Exception as e:
+        # A análise é só uma otimização; em caso de erro o OCR segue com a imagem original.
+        print(f" Erro na análise da página: {e}, usando imagem original")
+        return image
+
+
+def _analyze_and_correct_page(image: Image.Image) -> Optional[Image.Image]:
+
+    gray = _downscale_gray(image)
+
+    if is_blank_page(image, gray):
+        print(" Página em branco detectada, pulando OCR")
+        return None
+
+    rotation = detect_orientation(gray)
+    if rotation:
+        print(f" Página rotacionada {rotation}°, corrigindo orientação")
+        image = image.rotate(-rotation, expand=True)
+        gray = np.ascontiguousarray(np.rot90(gray, k=-(rotation // 90)))
+
+    skew = estimate_skew_angle(gray)
+    if abs(skew) >= PAGE_DESKEW_MIN_ANGLE:
+        print(f" Inclinação de {skew:.1f}° detectada, corrigindo")
+        image = image.rotate(
+            skew,
+            resample=Image.Resampling.BICUBIC,
+            expand=True,
+            fillcolor="white"
+        )
+
+    return image
+
+
 def extract_from_image_tesseract_only(image: Image.Image) -> Tuple[str, List[str]]:
 
     try:
@@ -124,41 +250,139 @@ def extract_from_image_tesseract_only(image: Image.Image) -> Tuple[str, List[str
         ocr_data = ocr_data[ocr_data['text'].notnull()].copy()
 
         if not ocr_data.empty and len(ocr_data) > 0:
-            ocr_data['line_num'] = (ocr_data['top'] // 20)
-
-            grouped = ocr_data.groupby('line_num')
+            words = [
+                (row.top, row.top + row.height, row.left, str(row.text))
+                for row in ocr_data.itertuples()
+                if str(row.text).strip()
+            ]
             table_rows = []
 
-            for _, group in grouped:
-                row_words = group.sort_values('left')['text'].tolist()
+            for line in group_words_into_lines(words):
+                row_words = [txt for _, txt in sorted(line)]
 
                 if len(row_words) >= 2:
                     table_rows.append(row_words)
 
-            if len(table_rows) > 2:
-                col_counts = [len(row) for row in table_rows]
-                variation = max(col_counts) - min(col_counts)
-
-                if variation <= TABLE_COLUMN_VARIATION_TOLERANCE:
-                    for row in table_rows:
-                        md_row = "| " + " | ".join([str(w) for w in row]) + " |"
-                        tables.append(md_row)
+            tables = build_table_rows(table_rows)
 
     return text_simple.strip(), tables
 
 
-def extract_from_image_easyocr(image: Image.Image) -> Tuple[str, List[str]]:
+def build_table_rows(table_rows: List[List[str]]) -> List[str]:
+
+    tables = []
+    if len(table_rows) > 2:
+        col_counts = [len(row) for row in table_rows]
+        variation = max(col_counts) - min(col_counts)
+
+        if variation <= TABLE_COLUMN_VARIATION_TOLERANCE:
+            for row in table_rows:
+                md_row = "| " + " | ".join([str(w) for w in row]) + " |"
+                tables.append(md_row)
+
+    return tables
+
+
+def group_words_into_lines(words: List[Tuple[float, float, float, str]]) -> List[List[Tuple[float, str]]]:
+
+    # Uma caixa entra na linha atual quando seu centro está perto do centro mediano da linha,
+    # com tolerância de meia altura (a menor entre a caixa e a mediana da linha). Assim uma
+    # caixa alta (logo, carimbo, caixa inclinada) não engole as linhas seguintes.
+    lines = []
+    centers = []
+    heights = []
+    for top, bottom, left, txt in sorted(words, key=lambda w: (w[0] + w[1]) / 2):
+        center = (top + bottom) / 2
+        height = max(bottom - top, 1)
+        if lines:
+            tolerance = min(height, float(np.median(heights))) / 2
+            if abs(center - float(np.median(centers))) <= tolerance:
+                lines[-1].append((left, txt))
+                centers.append(center)
+                heights.append(height)
+                continue
+
+        lines.append([(left, txt)])
+        centers = [center]
+        heights = [height]
+
+    return lines
+
+
+def extract_from_image_regions(image: Image.Image, reader) -> Tuple[str, List[str]]:
+
+    img_array = np.array(image.convert("RGB"))
+
+    # Uma única passada do detector (CRAFT) por página.
+    horizontal_list, free_list = reader.detect(img_array)
+    horizontal_list, free_list = horizontal_list[0], free_list[0]
+
+    if not horizontal_list and not free_list:
+        return "", []
+
+    # O reconhecimento roda apenas sobre os recortes detectados, em lotes.
+    result = reader.recognize(
+        img_array,
+        horizontal_list=horizontal_list,
+        free_list=free_list,
+        batch_size=OCR_REGION_BATCH_SIZE,
+        detail=1
+    )
+    words = [
+        (min(p[1] for p in bbox), max(p[1] for p in bbox), min(p[0] for p in bbox), txt)
+        for bbox, txt, conf in result
+        if conf > OCR_REGION_MIN_CONFIDENCE and txt.strip()
+    ]
+
+    text_lines = []
+    table_rows = []
+    for line in group_words_into_lines(words):
+        row_words = [txt for _, txt in sorted(line)]
+        text_lines.append(" ".join(row_words))
+        if len(row_words) >= 2:
+            table_rows.append(row_words)
+
+    return "\n".join(text_lines).strip(), build_table_rows(table_rows)
+
+
+def get_ocr_engine() -> str:
+    return "easyocr" if get_easyocr_reader() is not None else "tesseract"
+
+
+def extract_from_image_easyocr(image: Image.Image, analyze: bool = True) -> Tuple[str, List[str]]:
+    text, tables, _ = extract_from_image_with_engine(image, analyze)
+    return text, tables
+
+
+def extract_from_image_with_engine(image: Image.Image, analyze: bool = True) -> Tuple[str, List[str], str]:
+    # Também devolve o motor que produziu o resultado ("tesseract-fallback" indica erro no EasyOCR).
+
+    if analyze:
+        image = prepare_page_for_ocr(image)
+        if image is None:
+            return "", [], "none"
 
     reader = get_easyocr_reader()
 
     if reader is None:
         # EasyOCR not available, use Tesseract
-        return extract_from_image_tesseract_only(image)
+        return (*extract_from_image_tesseract_only(image), "tesseract")
 
     try:
         # Enhance image quality before processing
         enhanced_image = enhance_image_quality(image)
 
+        if OCR_REGION_MODE:
+            text_regions, tables = extract_from_image_regions(enhanced_image, reader)
+
+            if len(text_regions) < 50:
+                print("⚠Poucas regiões de texto, tentando Tesseract também...")
+                text_tesseract, tesseract_tables = extract_from_image_tesseract_only(image)
+                if len(text_tesseract) > len(text_regions):
+                    return text_tesseract, tesseract_tables, "easyocr"
+
+            return text_regions, tables, "easyocr"
+
         result = reader.readtext(np.array(enhanced_image), detail=1)
         text_easyocr = " ".join([txt for bbox, txt, conf in result if conf > 0.3])
 
@@ -169,14 +393,13 @@ def extract_from_image_easyocr(image: Image.Image) -> Tuple[str, List[str]]:
 
             if len(text_tesseract) > len(text_easyocr):
                 print("esseract encontrou mais texto, usando resultado do Tesseract")
-                return text_tesseract, tables
+                return text_tesseract, tables, "easyocr"
             else:
-                _, tables = extract_from_image_tesseract_only(image)
-                return text_easyocr.strip(), tables
+                return text_easyocr.strip(), tables, "easyocr"
         else:
             _, tables = extract_from_image_tesseract_only(image)
-            return text_easyocr.strip(), tables
+            return text_easyocr.strip(), tables, "easyocr"
 
     except Exception as e:
         print(f"Erro no EasyOCR: {e}, usando Tesseract")
-        return extract_from_image_tesseract_only(image)
+        return (*extract_from_image_tesseract_only(image), "tesseract-fallback")
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from PIL import Image
+
+from config import (
+    PAGE_CACHE_ENABLED,
+    PAGE_CACHE_MAX_ENTRIES,
+    PAGE_CACHE_DISK_ENABLED,
+    PAGE_CACHE_DISK_MAX_ENTRIES,
+    PAGE_CACHE_DIR,
+    OCR_DPI,
+    OCR_REGION_MODE,
+    EASYOCR_LANGUAGES,
+    TESSERACT_DEFAULT_LANG,
+    TESSERACT_FALLBACK_LANG,
+    TABLE_COLUMN_VARIATION_TOLERANCE,
+    OCR_REGION_MIN_CONFIDENCE,
+    PAGE_ANALYSIS_ENABLED,
+    PAGE_ANALYSIS_MAX_SIDE,
+    PAGE_BLANK_INK_DELTA,
+    PAGE_BLANK_MAX_STD,
+    PAGE_BLANK_MAX_COMPONENTS,
+    PAGE_BLANK_MIN_COMPONENT_AREA,
+    PAGE_OSD_MIN_CONFIDENCE,
+    PAGE_DESKEW_MAX_ANGLE,
+    PAGE_DESKEW_STEP,
+    PAGE_DESKEW_MIN_ANGLE
+)
+
+# Mudanças na configuração do OCR ou da análise de página invalidam as entradas antigas.
+_CONFIG_TAG = hashlib.sha1(repr((
+    OCR_DPI, OCR_REGION_MODE, OCR_REGION_MIN_CONFIDENCE, EASYOCR_LANGUAGES,
+    TESSERACT_DEFAULT_LANG, TESSERACT_FALLBACK_LANG, TABLE_COLUMN_VARIATION_TOLERANCE,
+    PAGE_ANALYSIS_ENABLED, PAGE_ANALYSIS_MAX_SIDE, PAGE_BLANK_INK_DELTA,
+    PAGE_BLANK_MAX_STD, PAGE_BLANK_MAX_COMPONENTS, PAGE_BLANK_MIN_COMPONENT_AREA,
+    PAGE_OSD_MIN_CONFIDENCE, PAGE_DESKEW_MAX_ANGLE, PAGE_DESKEW_STEP, PAGE_DESKEW_MIN_ANGLE
+)).encode()).hexdigest()[:8]
+
+
+def bytes_key(data: bytes, engine: str) -> str:
+    return f"raw-{_CONFIG_TAG}-{engine}-{hashlib.sha256(data).hexdigest()}"
+
+
+def image_pixels_key(image: Image.Image, engine: str) -> str:
+
+    # Só reaproveitamos OCR quando os pixels são idênticos: um hash perceptual juntaria
+    # páginas do mesmo modelo com valores, nomes e CPFs diferentes.
+    digest = hashlib.sha256(f"{image.mode}|{image.size}".encode())
+    digest.update(image.tobytes())
+    return f"pixels-{_CONFIG_TAG}-{engine}-{digest.hexdigest()}"
+
+
+class PageCache:
+
+    def __init__(
+        self,
+        max_entries: int = PAGE_CACHE_MAX_ENTRIES,
+        cache_dir: Optional[str] = PAGE_CACHE_DIR if PAGE_CACHE_DISK_ENABLED else None,
+        max_disk_entries: int = PAGE_CACHE_DISK_MAX_ENTRIES
+    ):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._disk_entries = 0
+
+        if self.cache_dir:
+            # O texto extraído contém dados pessoais: diretório e arquivos só para o dono.
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            os.chmod(self.cache_dir, 0o700)
+            self._disk_entries = len(self._disk_files())
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def _disk_files(self):
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(".json")
+        ]
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not PAGE_CACHE_ENABLED:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+
+        entry = self._read_disk(key)
+        if entry is None:
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._store(key, entry)
+        return entry
+
+    def record_miss(self) -> None:
+        # Chamado uma vez por página que precisou de OCR, não por consulta.
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key: str, entry: Dict) -> None:
+        if not PAGE_CACHE_ENABLED:
+            return
+
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def _store(self, key: str, entry: Dict) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        if not self.cache_dir:
+            return None
+
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.pop("key", None) != key:
+                return None
+            # Atualiza o mtime para que a remoção no disco também siga a ordem LRU.
+            os.utime(path)
+            return data
+        except Exception as e:
+            print(f" Erro ao ler cache de página: {e}")
+            return None
+
+    def _write_disk(self, key: str, entry: Dict) -> None:
+        if not self.cache_dir:
+            return
+
+        path = self._disk_path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            is_new = not os.path.exists(path)
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"key": key, **entry}, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f" Erro ao gravar cache de página: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        if is_new:
+            with self._disk_lock:
+                self._disk_entries += 1
+                if self._disk_entries > self.max_disk_entries:
+                    self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        # Remove os arquivos menos usados até sobrar 90% do limite.
+        files = []
+        for path in self._disk_files():
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        files.sort()
+
+        target = int(self.max_disk_entries * 0.9)
+        for _, path in files[:max(len(files) - target, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._disk_entries = len(self._disk_files())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            pages = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / pages, 3) if pages else 0.0
+            }
+
+
+page_cache = PageCache()
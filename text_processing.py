@@ -1,21 +1,208 @@
-from typing import List
+import re
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from config import CHUNK_SIZE, CHUNK_OVERLAP, TOKEN_ESTIMATION_RATIO
+from config import CHUNK_SIZE, CHUNK_OVERLAP, MAX_TOKENS_PER_CHUNK, TOKEN_ESTIMATION_RATIO
+
+PAGE_MARKER_PATTERN = re.compile(r"\n--- Página (\d+)(?: \(OCR\))? ---\n")
+TERM_PATTERN = re.compile(r"\w+")
+MIN_TERM_LENGTH = 4
+MAX_TERM_FREQUENCY = 0xFFFF
 
 def count_tokens(text: str) -> int:
     return len(text) // TOKEN_ESTIMATION_RATIO
 
-def split_text_into_chunks(
-    text: str, 
-    chunk_size: int = CHUNK_SIZE, 
-    chunk_overlap: int = CHUNK_OVERLAP
-) -> List[str]:
+def count_terms(text: str) -> Counter:
+    # Termos viram hashes de 32 bits: os chunks guardam só inteiros, não strings.
+    return Counter(
+        zlib.crc32(w.encode())
+        for w in TERM_PATTERN.findall(text.lower())
+        if len(w) >= MIN_TERM_LENGTH
+    )
 
-    splitter = RecursiveCharacterTextSplitter(
+@lru_cache(maxsize=8)
+def get_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         length_function=len,
         add_start_index=True
     )
-    chunks = splitter.split_text(text)
-    return chunks
+
+
+class Chunk:
+    # Guarda apenas offsets no texto compartilhado do documento, sem copiar o conteúdo.
+    __slots__ = ("document", "start", "end", "first_page", "last_page", "token_count", "term_ids", "term_freqs")
+
+    def __init__(
+        self,
+        document: "ChunkedDocument",
+        start: int,
+        end: int,
+        first_page: Optional[int],
+        last_page: Optional[int]
+    ):
+        self.document = document
+        self.start = start
+        self.end = end
+        self.first_page = first_page
+        self.last_page = last_page
+        self.token_count = (end - start) // TOKEN_ESTIMATION_RATIO
+
+        terms = sorted(count_terms(self.text).items())
+        self.term_ids = array("I", (term for term, _ in terms))
+        self.term_freqs = array("H", (min(freq, MAX_TERM_FREQUENCY) for _, freq in terms))
+
+    @property
+    def text(self) -> str:
+        return self.document.text[self.start:self.end]
+
+    def score(self, terms: List[int]) -> int:
+        score = 0
+        for term in terms:
+            i = bisect_left(self.term_ids, term)
+            if i < len(self.term_ids) and self.term_ids[i] == term:
+                score += self.term_freqs[i]
+        return score
+
+
+class ChunkedDocument:
+    __slots__ = ("text", "pages", "chunks", "token_count", "chunk_size", "chunk_overlap")
+
+    def __init__(self, text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._build(text)
+
+    def _build(self, text: str) -> None:
+        self.text = text
+        self.token_count = count_tokens(text)
+        self.pages = find_page_spans(text)
+
+        # Documentos pequenos vão inteiros para a LLM, como um único chunk.
+        if self.token_count <= MAX_TOKENS_PER_CHUNK:
+            self.chunks = [Chunk(self, 0, len(text), None, None)]
+        else:
+            self.chunks = self._chunk_pages(self.pages)
+
+    def _chunk_pages(self, pages: List[Tuple[Optional[int], int, int]]) -> List[Chunk]:
+        chunks = []
+        group = []
+        for page in pages:
+            _, start, end = page
+            if group and end - group[0][1] > self.chunk_size:
+                chunks.extend(self._page_group_chunk(group))
+                group = []
+
+            if end - start > self.chunk_size:
+                chunks.extend(self._split_page(page))
+            else:
+                group.append(page)
+
+        if group:
+            chunks.extend(self._page_group_chunk(group))
+        return chunks
+
+    def _page_group_chunk(self, group: List[Tuple[Optional[int], int, int]]) -> List[Chunk]:
+        # Páginas curtas vizinhas são unidas em um chunk de até chunk_size caracteres.
+        start, end = group[0][1], group[-1][2]
+        if not self.text[start:end].strip():
+            return []
+        numbers = [page for page, _, _ in group if page is not None]
+        first_page, last_page = (numbers[0], numbers[-1]) if numbers else (None, None)
+        return [Chunk(self, start, end, first_page, last_page)]
+
+    def _split_page(self, page: Tuple[Optional[int], int, int]) -> List[Chunk]:
+        page_num, start, end = page
+        splitter = get_text_splitter(self.chunk_size, self.chunk_overlap)
+        chunks = []
+        for doc in splitter.create_documents([self.text[start:end]]):
+            chunk_start = start + doc.metadata["start_index"]
+            chunks.append(Chunk(self, chunk_start, chunk_start + len(doc.page_content), page_num, page_num))
+        return chunks
+
+    @property
+    def page_count(self) -> int:
+        return sum(1 for page, _, _ in self.pages if page is not None and page >= 1)
+
+    def get_pages(self, first_page: int, last_page: int) -> List[Dict]:
+        return [
+            {"page": page, "text": self.text[start:end]}
+            for page, start, end in self.pages
+            if page is not None and first_page <= page <= last_page
+        ]
+
+    def replace_page(self, page: int, page_text: str) -> None:
+
+        index = next((i for i, (p, _, _) in enumerate(self.pages) if p == page), None)
+        if index is None:
+            raise ValueError(f"Página {page} não encontrada no documento")
+
+        _, start, end = self.pages[index]
+        text = self.text[:start] + page_text + self.text[end:]
+        delta = len(page_text) - (end - start)
+
+        # Se o documento cabe (ou cabia) em um único chunk, refazer tudo é trivial.
+        if self.token_count <= MAX_TOKENS_PER_CHUNK or count_tokens(text) <= MAX_TOKENS_PER_CHUNK:
+            self._build(text)
+            return
+
+        # Só o grupo de páginas que continha a página alterada é refeito: expande o intervalo
+        # até cobrir chunks e páginas inteiros (uma página longa gera vários chunks).
+        low, high = start, end
+        while True:
+            selected = [i for i, (_, s, e) in enumerate(self.pages) if s <= high and e >= low]
+            affected = [c for c in self.chunks if c.start <= high and c.end >= low]
+            new_low = min([low, self.pages[selected[0]][1]] + [c.start for c in affected])
+            new_high = max([high, self.pages[selected[-1]][2]] + [c.end for c in affected])
+            if (new_low, new_high) == (low, high):
+                break
+            low, high = new_low, new_high
+
+        self.text = text
+        self.token_count = count_tokens(text)
+        self.pages = [
+            (p, s, e + delta) if i == index else ((p, s + delta, e + delta) if i > index else (p, s, e))
+            for i, (p, s, e) in enumerate(self.pages)
+        ]
+
+        chunks = []
+        for chunk in self.chunks:
+            if chunk.start > high:
+                chunk.start += delta
+                chunk.end += delta
+                chunks.append(chunk)
+            elif chunk.end < low:
+                chunks.append(chunk)
+        chunks.extend(self._chunk_pages([self.pages[i] for i in selected]))
+        chunks.sort(key=lambda chunk: chunk.start)
+        self.chunks = chunks
+
+
+def find_page_spans(text: str) -> List[Tuple[Optional[int], int, int]]:
+
+    # Sem marcadores (ex.: saída do Unstructured) o número da página é desconhecido.
+    markers = list(PAGE_MARKER_PATTERN.finditer(text))
+    if not markers:
+        return [(None, 0, len(text))]
+
+    pages = []
+    if text[:markers[0].start()].strip():
+        pages.append((None, 0, markers[0].start()))
+
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        pages.append((int(marker.group(1)), marker.end(), end))
+
+    return pages
+
+def chunk_document(
+    text: str,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP
+) -> ChunkedDocument:
+    return ChunkedDocument(text, chunk_size, chunk_overlap)